@@ -5,13 +5,17 @@ from __future__ import annotations
 
 import argparse
 import hashlib
-import json
+import os
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
+import orjson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from scipy.stats import skew as scipy_skew
 from scipy.stats import spearmanr
 
@@ -642,6 +646,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
       metricsById: new Map(),
       metadataById: new Map(),
       cache: new Map(),
+      compareRankCache: new Map(),
       mode: 'cv',
       currentId: null,
       scatterLabels: false,
@@ -660,6 +665,13 @@ HTML_TEMPLATE = """<!DOCTYPE html>
     ];
 
     const WATERFALL_QUARTILE_COLORS = ['#4B0055', '#2E6F95', '#3AB47D', '#F2E419'];
+    const FETCH_CACHE_LIMIT = 200;
+    const COMPARE_SORTERS = {
+      negative: (a, b) => a.rho - b.rho,
+      positive: (a, b) => b.rho - a.rho,
+      absolute: (a, b) => Math.abs(b.rho) - Math.abs(a.rho),
+    };
+    const fetchCache = new Map();
 
     function formatNum(v, d=4) {
       if (v === null || v === undefined || Number.isNaN(v)) return 'NA';
@@ -725,10 +737,25 @@ HTML_TEMPLATE = """<!DOCTYPE html>
     }
 
     async function fetchJson(path) {
+      // Memoize the parsed payload promise per URL (insertion-order LRU) so repeated
+      // filter toggles and overlapping renders never re-download or re-parse a file.
+      if (fetchCache.has(path)) {
+        const hit = fetchCache.get(path);
+        fetchCache.delete(path);
+        fetchCache.set(path, hit);
+        return hit;
+      }
       const sep = path.includes('?') ? '&' : '?';
-      const r = await fetch(`${path}${sep}v=${DATA_VERSION}`, { cache: 'no-store' });
-      if (!r.ok) throw new Error(`Failed to fetch ${path}: ${r.status}`);
-      return await r.json();
+      const pending = fetch(`${path}${sep}v=${DATA_VERSION}`, { cache: 'no-store' }).then((r) => {
+        if (!r.ok) throw new Error(`Failed to fetch ${path}: ${r.status}`);
+        return r.json();
+      });
+      pending.catch(() => {
+        if (fetchCache.get(path) === pending) fetchCache.delete(path);
+      });
+      fetchCache.set(path, pending);
+      if (fetchCache.size > FETCH_CACHE_LIMIT) fetchCache.delete(fetchCache.keys().next().value);
+      return pending;
     }
 
     async function loadSeries(biomarkerId) {
@@ -1786,12 +1813,16 @@ HTML_TEMPLATE = """<!DOCTYPE html>
       const trimLabel = trimLabelFromPct(compareTrimSliderEl.value);
       compareTopNEl.value = String(topN);
 
-      let ranked = metricsForView(getCompareMetrics(), cohort, trimMode, statKey).slice();
-      const rankVal = (m) => (mode === 'absolute' ? Math.abs(m.rho) : m.rho);
-      if (mode === 'negative') ranked.sort((a, b) => rankVal(a) - rankVal(b));
-      if (mode === 'positive') ranked.sort((a, b) => rankVal(b) - rankVal(a));
-      if (mode === 'absolute') ranked.sort((a, b) => rankVal(b) - rankVal(a));
-      ranked = ranked.slice(0, topN);
+      // Full ranking only depends on the filters below; Top N just slices the cached order.
+      const rankKey = `${cohort}|${mode}|${statKey}|${trimMode}|${compareCategoryEl.value}|${compareIncludeEnvEl.checked}`;
+      let fullRanked = state.compareRankCache.get(rankKey);
+      if (!fullRanked) {
+        fullRanked = metricsForView(getCompareMetrics(), cohort, trimMode, statKey);
+        const cmp = COMPARE_SORTERS[mode];
+        if (cmp) fullRanked.sort(cmp);
+        state.compareRankCache.set(rankKey, fullRanked);
+      }
+      const ranked = fullRanked.slice(0, topN);
 
       const y = ranked.map(r => r.display_name).reverse();
       const categoryLabel = compareCategoryEl.options[compareCategoryEl.selectedIndex]?.textContent || 'All';
@@ -1906,6 +1937,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
       state.seriesIndex = index;
       state.metricsById = new Map(metrics.map(m => [m.biomarker_id, m]));
       state.metadataById = new Map(metadata.map(m => [m.biomarker_id, m]));
+      state.compareRankCache.clear();
 
       showLowNEl.checked = true;
       includeEnvEl.checked = false;
@@ -2231,11 +2263,13 @@ def make_display_name(name: str, unit: str) -> str:
     return base
 
 
+MICRO_SIGN_TRANS = str.maketrans({"μ": "u", "µ": "u"})
+NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
 def normalize_text(s: str) -> str:
-    x = str(s or "").lower()
-    x = x.replace("μ", "u").replace("µ", "u")
-    x = re.sub(r"[^a-z0-9]+", " ", x)
-    return re.sub(r"\s+", " ", x).strip()
+    # Collapsing each non-alphanumeric run to one space already leaves single spaces.
+    return NON_ALNUM_RE.sub(" ", str(s or "").lower().translate(MICRO_SIGN_TRANS)).strip()
 
 
 CORE_CATEGORY_SET = {
@@ -2441,6 +2475,8 @@ AGE_BINS = list(np.arange(20, 90, 5)) + [200]
 AGE_LABELS = [f"{a}-{a+4}" for a in range(20, 85, 5)] + ["85+"]
 AGE_MIDS = {lab: mid for lab, mid in zip(AGE_LABELS, [a + 2.5 for a in range(20, 85, 5)] + [87.5])}
 TRIM_PCTS = [0, 5, 10, 15, 20, 25]
+JSON_SIG_DIGITS = 6
+POINT_STAT_KEYS = frozenset({"mean", "std", "median", "q25", "q75", "p10", "p90", "skewness", "cv"})
 
 
 def trim_mode_key(pct: int) -> str:
@@ -2463,6 +2499,17 @@ def trim_mode_quantiles(mode: str) -> tuple[float, float] | None:
     return lo / 100.0, hi / 100.0
 
 
+def compact_float(v: float, digits: int = JSON_SIG_DIGITS) -> float:
+    # Plots need far fewer digits than float64 repr emits; shorter numbers shrink series JSON.
+    return float(f"{float(v):.{digits}g}")
+
+
+def compact_points(points: list[dict]) -> list[dict]:
+    # Serialization-only copy: trends are computed from the full-precision points, since
+    # rounding can tie neighbouring bins and shift Spearman rho/p.
+    return [{k: compact_float(v) if k in POINT_STAT_KEYS and v is not None else v for k, v in p.items()} for p in points]
+
+
 def slope(x: np.ndarray, y: np.ndarray) -> float:
     if len(x) < 2:
         return np.nan
@@ -2565,48 +2612,54 @@ def build_outputs(
     if "unit" not in cv_df.columns:
         cv_df["unit"] = ""
 
+    def group_to_points(g: pd.DataFrame) -> list[dict]:
+        # Callers sort by age_mid once up front, so rows already arrive in age order.
+        pts = []
+        for r in g.itertuples(index=False):
+            mean_v = float(getattr(r, "mean"))
+            std_v = getattr(r, "std", np.nan)
+            med_v = getattr(r, "median", np.nan)
+            q25_v = getattr(r, "q25", np.nan)
+            q75_v = getattr(r, "q75", np.nan)
+            p10_v = getattr(r, "p10", np.nan)
+            p90_v = getattr(r, "p90", np.nan)
+            skew_v = getattr(r, "skewness", np.nan)
+            cv_v = getattr(r, "cv", np.nan)
+            pts.append(
+                {
+                    "age_bin": str(getattr(r, "age_bin")),
+                    "age_mid": float(getattr(r, "age_mid")),
+                    "n": int(getattr(r, "n")),
+                    "mean": mean_v,
+                    "std": float(std_v) if pd.notna(std_v) else None,
+                    "median": float(med_v) if pd.notna(med_v) else mean_v,
+                    "q25": float(q25_v) if pd.notna(q25_v) else None,
+                    "q75": float(q75_v) if pd.notna(q75_v) else None,
+                    "p10": float(p10_v) if pd.notna(p10_v) else None,
+                    "p90": float(p90_v) if pd.notna(p90_v) else None,
+                    "skewness": float(skew_v) if pd.notna(skew_v) else None,
+                    "cv": float(cv_v) if pd.notna(cv_v) else None,
+                    "passes_n_threshold": bool(getattr(r, "passes_n_threshold")),
+                }
+            )
+        return pts
+
     def grouped_to_points_map(df: pd.DataFrame) -> dict[str, list[dict]]:
         out: dict[str, list[dict]] = {}
         if df is None or df.empty:
             return out
-        for bid, g in df.groupby("biomarker_id", observed=True):
-            pts = []
-            for r in g.sort_values("age_mid").itertuples(index=False):
-                mean_v = float(getattr(r, "mean"))
-                std_v = getattr(r, "std", np.nan)
-                med_v = getattr(r, "median", np.nan)
-                q25_v = getattr(r, "q25", np.nan)
-                q75_v = getattr(r, "q75", np.nan)
-                p10_v = getattr(r, "p10", np.nan)
-                p90_v = getattr(r, "p90", np.nan)
-                skew_v = getattr(r, "skewness", np.nan)
-                cv_v = getattr(r, "cv", np.nan)
-                pts.append(
-                    {
-                        "age_bin": str(getattr(r, "age_bin")),
-                        "age_mid": float(getattr(r, "age_mid")),
-                        "n": int(getattr(r, "n")),
-                        "mean": mean_v,
-                        "std": float(std_v) if pd.notna(std_v) else None,
-                        "median": float(med_v) if pd.notna(med_v) else mean_v,
-                        "q25": float(q25_v) if pd.notna(q25_v) else None,
-                        "q75": float(q75_v) if pd.notna(q75_v) else None,
-                        "p10": float(p10_v) if pd.notna(p10_v) else None,
-                        "p90": float(p90_v) if pd.notna(p90_v) else None,
-                        "skewness": float(skew_v) if pd.notna(skew_v) else None,
-                        "cv": float(cv_v) if pd.notna(cv_v) else None,
-                        "passes_n_threshold": bool(getattr(r, "passes_n_threshold")),
-                    }
-                )
-            out[str(bid)] = pts
+        df = df.sort_values(["biomarker_id", "age_mid"], kind="stable")
+        for bid, g in df.groupby("biomarker_id", observed=True, sort=False):
+            out[str(bid)] = group_to_points(g)
         return out
 
     def grouped_to_sex_points_map(df: pd.DataFrame) -> dict[str, dict[str, list[dict]]]:
         out: dict[str, dict[str, list[dict]]] = {}
         if df is None or df.empty:
             return out
-        for (bid, sex_norm), g in df.groupby(["biomarker_id", "sex_norm"], observed=True):
-            out.setdefault(str(bid), {})[str(sex_norm)] = grouped_to_points_map(g)[str(bid)]
+        df = df.sort_values(["biomarker_id", "sex_norm", "age_mid"], kind="stable")
+        for (bid, sex_norm), g in df.groupby(["biomarker_id", "sex_norm"], observed=True, sort=False):
+            out.setdefault(str(bid), {})[str(sex_norm)] = group_to_points(g)
         return out
 
     raw_samples: dict[str, list[dict]] = {}
@@ -2677,7 +2730,10 @@ def build_outputs(
             if len(g_pool) > raw_sample_n:
                 idx = rng.choice(len(g_pool), size=raw_sample_n, replace=False)
                 g_pool = g_pool.iloc[idx]
-            raw_samples[str(bid)] = [{"age_years": float(r.age_years), "value": float(r.value)} for r in g_pool.itertuples(index=False)]
+            raw_samples[str(bid)] = [
+                {"age_years": compact_float(r.age_years), "value": compact_float(r.value)}
+                for r in g_pool.itertuples(index=False)
+            ]
 
         for (bid, sex_norm), g in use[use["sex_norm"].isin(["male", "female"])].groupby(["biomarker_id", "sex_norm"], observed=True):
             g2 = g[["age_years", "value"]].dropna()
@@ -2685,7 +2741,8 @@ def build_outputs(
                 idx = rng.choice(len(g2), size=raw_sample_n, replace=False)
                 g2 = g2.iloc[idx]
             raw_samples_by_sex.setdefault(str(bid), {})[str(sex_norm)] = [
-                {"age_years": float(r.age_years), "value": float(r.value)} for r in g2.itertuples(index=False)
+                {"age_years": compact_float(r.age_years), "value": compact_float(r.value)}
+                for r in g2.itertuples(index=False)
             ]
     else:
         # Fallback without participant-level long table.
@@ -2819,14 +2876,31 @@ def build_outputs(
 
     series_index: dict[str, str] = {}
     series_payloads: dict[str, dict] = {}
-    meta_by_id = metadata.set_index("biomarker_id").to_dict(orient="index")
+    # Read only the per-series fields straight from the columns instead of boxing every
+    # metadata column into a nested dict.
+    meta_rows = zip(
+        metadata["biomarker_id"].astype(str),
+        metadata["biomarker_name"],
+        metadata["display_name"],
+        metadata["variable_name"],
+        metadata["unit"],
+        metadata["category"],
+        metadata["is_environmental"],
+        metadata["is_core_clinical"],
+        metadata["raw_total_n"],
+        metadata["raw_sample_cap"],
+    )
 
-    for bid in metadata["biomarker_id"].astype(str).tolist():
+    for bid, name, display, var_name, unit, category, is_env, is_core, raw_total, raw_cap in meta_rows:
         rel_path = safe_series_filename(bid)
-        md = meta_by_id.get(bid, {})
         series_index[bid] = rel_path
-        points_by_filter = {mode: pooled_points_by_mode.get(mode, {}).get(bid, []) for mode in [trim_mode_key(p) for p in TRIM_PCTS]}
-        sex_points_by_filter = {mode: sex_points_by_mode.get(mode, {}).get(bid, {}) for mode in [trim_mode_key(p) for p in TRIM_PCTS]}
+        points_by_filter = {
+            mode: compact_points(pooled_points_by_mode.get(mode, {}).get(bid, [])) for mode in [trim_mode_key(p) for p in TRIM_PCTS]
+        }
+        sex_points_by_filter = {
+            mode: {sx: compact_points(pts) for sx, pts in sex_points_by_mode.get(mode, {}).get(bid, {}).items()}
+            for mode in [trim_mode_key(p) for p in TRIM_PCTS]
+        }
         trends_by_filter_cv = {mode: pooled_trends_by_mode_cv.get(mode, {}).get(bid, {}) for mode in [trim_mode_key(p) for p in TRIM_PCTS]}
         trends_by_filter_mean = {mode: pooled_trends_by_mode_mean.get(mode, {}).get(bid, {}) for mode in [trim_mode_key(p) for p in TRIM_PCTS]}
         trends_by_filter_skew = {mode: pooled_trends_by_mode_skew.get(mode, {}).get(bid, {}) for mode in [trim_mode_key(p) for p in TRIM_PCTS]}
@@ -2836,19 +2910,16 @@ def build_outputs(
         all_points = points_by_filter.get("all", [])
         series_payloads[rel_path] = {
             "biomarker_id": bid,
-            "biomarker_name": str(md.get("biomarker_name") or bid),
-            "display_name": str(md.get("display_name") or make_display_name(
-                str(md.get("biomarker_name") or bid),
-                str(md.get("unit") or ""),
-            )),
-            "variable_name": str(md.get("variable_name") or bid),
-            "unit": str(md.get("unit") or ""),
-            "category": md.get("category", "Other Clinical"),
-            "is_environmental": bool(md.get("is_environmental", False)),
-            "is_core_clinical": bool(md.get("is_core_clinical", False)),
-            "raw_total_n": int(md.get("raw_total_n", 0)),
+            "biomarker_name": str(name or bid),
+            "display_name": str(display or make_display_name(str(name or bid), str(unit or ""))),
+            "variable_name": str(var_name or bid),
+            "unit": str(unit or ""),
+            "category": category or "Other Clinical",
+            "is_environmental": bool(is_env),
+            "is_core_clinical": bool(is_core),
+            "raw_total_n": int(raw_total),
             "raw_total_n_by_sex": raw_counts_by_sex.get(str(bid), {}),
-            "raw_sample_cap": int(md.get("raw_sample_cap", raw_sample_n)),
+            "raw_sample_cap": int(raw_cap),
             "points": all_points,
             "points_by_filter": points_by_filter,
             "raw_sample": raw_samples.get(str(bid), []),
@@ -2876,6 +2947,38 @@ def build_outputs(
     return metadata, metrics, series_index, series_payloads
 
 
+def json_bytes(payload: object, indent: bool = False) -> bytes:
+    # orjson encodes straight to UTF-8 bytes (NaN/inf become null) and handles numpy scalars.
+    option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent else 0)
+    return orjson.dumps(payload, option=option)
+
+
+def write_json(path: Path, payload: object, indent: bool = False) -> None:
+    path.write_bytes(json_bytes(payload, indent=indent))
+
+
+def write_files_parallel(blobs: list[tuple[Path, bytes]]) -> None:
+    # Many small files are syscall-latency bound; write() releases the GIL so threads overlap.
+    for parent in {p.parent for p, _ in blobs}:
+        ensure_dir(parent)
+    workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        list(ex.map(lambda item: item[0].write_bytes(item[1]), blobs))
+
+
+def series_points_table(series_payloads: dict[str, dict]) -> pa.Table:
+    """All binned series points as one long table keyed by (biomarker_id, trim_mode, sex)."""
+    rows = []
+    for payload in series_payloads.values():
+        bid = payload["biomarker_id"]
+        for mode, pts in payload["points_by_filter"].items():
+            rows.extend({"biomarker_id": bid, "trim_mode": mode, "sex": "pooled", **pt} for pt in pts)
+        for mode, by_sex in payload["sex_points_by_filter"].items():
+            for sex, pts in by_sex.items():
+                rows.extend({"biomarker_id": bid, "trim_mode": mode, "sex": sex, **pt} for pt in pts)
+    return pa.Table.from_pandas(pd.DataFrame(rows), preserve_index=False)
+
+
 def main() -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument("--cv", default="data/processed/cv_by_age.parquet")
@@ -2887,6 +2990,11 @@ def main() -> None:
     ap.add_argument("--random-seed", type=int, default=42)
     ap.add_argument("--out", default="dashboard/index.html")
     ap.add_argument("--json-out", default="dashboard/dashboard_data.json")
+    ap.add_argument(
+        "--series-parquet",
+        default="",
+        help="Also write every series point to this single zstd Parquet file (the dashboard itself reads the JSON files)",
+    )
     args = ap.parse_args()
 
     cv_path = Path(args.cv_all)
@@ -2916,27 +3024,24 @@ def main() -> None:
     data_dir = out_html.parent / "data"
     series_dir = data_dir / "series"
 
-    ensure_dir(out_html.parent)
-    ensure_dir(data_dir)
-    ensure_dir(series_dir)
+    ensure_dir(series_dir)  # parents=True also creates data_dir and the HTML output directory.
     ensure_dir(out_json.parent)
 
     # Remove old per-series files so output always matches current dataset.
-    for old in series_dir.glob("*.json"):
-        old.unlink()
+    with os.scandir(series_dir) as it:
+        for entry in it:
+            if entry.name.endswith(".json") and entry.is_file():
+                os.unlink(entry.path)
 
-    (data_dir / "metadata.json").write_text(
-        json.dumps(metadata.to_dict(orient="records"), ensure_ascii=True, allow_nan=False), encoding="utf-8"
-    )
-    (data_dir / "metrics.json").write_text(json.dumps(metrics, ensure_ascii=True, allow_nan=False), encoding="utf-8")
-    (data_dir / "series_index.json").write_text(
-        json.dumps(series_index, ensure_ascii=True, allow_nan=False), encoding="utf-8"
-    )
+    write_json(data_dir / "metadata.json", metadata.to_dict(orient="records"))
+    write_json(data_dir / "metrics.json", metrics)
+    write_json(data_dir / "series_index.json", series_index)
 
-    for rel, payload in series_payloads.items():
-        p = data_dir / rel
-        ensure_dir(p.parent)
-        p.write_text(json.dumps(payload, ensure_ascii=True, allow_nan=False), encoding="utf-8")
+    write_files_parallel([(data_dir / rel, json_bytes(payload)) for rel, payload in series_payloads.items()])
+    if args.series_parquet:
+        series_parquet = Path(args.series_parquet)
+        ensure_dir(series_parquet.parent)
+        pq.write_table(series_points_table(series_payloads), series_parquet, compression="zstd", row_group_size=8192)
 
     summary_payload = {
         "metadata_count": len(metadata),
@@ -2945,16 +3050,18 @@ def main() -> None:
         "raw_sample_n": args.raw_sample_n,
         "data_dir": str(data_dir),
     }
-    out_json.write_text(json.dumps(summary_payload, ensure_ascii=True, indent=2, allow_nan=False), encoding="utf-8")
+    write_json(out_json, summary_payload, indent=True)
 
     data_version = str(int(time.time()))
-    out_html.write_text(HTML_TEMPLATE.replace("__DATA_VERSION__", data_version), encoding="utf-8")
+    out_html.write_bytes(HTML_TEMPLATE.replace("__DATA_VERSION__", data_version).encode("utf-8"))
 
     print(f"Wrote dashboard HTML: {out_html}")
     print(f"Wrote metadata: {data_dir / 'metadata.json'}")
     print(f"Wrote metrics: {data_dir / 'metrics.json'}")
     print(f"Wrote series index: {data_dir / 'series_index.json'}")
     print(f"Wrote {len(series_payloads)} series files under: {series_dir}")
+    if args.series_parquet:
+        print(f"Wrote series Parquet: {args.series_parquet}")
     print(f"Wrote dashboard summary JSON: {out_json}")
 
 
@@ -8,36 +8,57 @@ from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from scipy.stats import spearmanr
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from scipy.stats import t as student_t
 
 from nhanes_common import ensure_dir
 
 
-def assign_age_bins(age: pd.Series) -> tuple[pd.Series, pd.Series]:
-    edges = list(np.arange(20, 90, 5)) + [200]
-    labels = [f"{a}-{a+4}" for a in range(20, 85, 5)] + ["85+"]
-    mids = [a + 2.5 for a in range(20, 85, 5)] + [87.5]
+AGE_EDGES = np.array(list(np.arange(20, 90, 5)) + [200], dtype=float)
+AGE_LABELS = [f"{a}-{a+4}" for a in range(20, 85, 5)] + ["85+"]
+AGE_MIDS = np.array([a + 2.5 for a in range(20, 85, 5)] + [87.5], dtype=float)
+
 
-    b = pd.cut(age, bins=edges, labels=labels, right=False, include_lowest=True)
-    m = b.map(dict(zip(labels, mids))).astype(float)
+def assign_age_bins(age: pd.Series) -> tuple[pd.Series, pd.Series]:
+    # Left-closed bins like pd.cut(right=False); ages outside [20, 200) or missing get NaN.
+    a = pd.to_numeric(age, errors="coerce").to_numpy(dtype=float)
+    idx = np.digitize(a, AGE_EDGES) - 1
+    valid = (idx >= 0) & (idx < len(AGE_LABELS))
+    codes = np.where(valid, idx, -1)
+
+    b = pd.Series(pd.Categorical.from_codes(codes, categories=AGE_LABELS, ordered=True), index=age.index)
+    m = pd.Series(np.where(valid, AGE_MIDS[np.clip(idx, 0, len(AGE_MIDS) - 1)], np.nan), index=age.index)
     return b, m
 
 
 def compute_binned(df: pd.DataFrame) -> pd.DataFrame:
-    tmp = df.copy()
-    tmp["age_bin"], tmp["age_mid"] = assign_age_bins(tmp["age_years"])
-    tmp = tmp.dropna(subset=["age_bin", "value"])
-
     group_cols = ["biomarker_id", "biomarker_name"]
-    if "unit" in tmp.columns:
+    if "unit" in df.columns:
         group_cols.append("unit")
 
+    _, age_mid = assign_age_bins(df["age_years"])
+    # from_pandas maps NaN/None to null, so drop_null leaves out rows with a missing key or value
+    # like pandas groupby defaults, without an object-dtype mask.
+    columns = {c: df[c] for c in group_cols}
+    columns.update(age_mid=age_mid, value=pd.to_numeric(df["value"]))
+    tbl = pa.table({c: pa.array(s, from_pandas=True) for c, s in columns.items()}).drop_null()
+    # Arrow's hash aggregation is multi-threaded C++; age_bin is recovered from age_mid afterwards.
     grouped = (
-        tmp.groupby(group_cols + ["age_bin", "age_mid"], observed=True)["value"]
-        .agg(["count", "mean", "std"])
-        .reset_index()
-        .rename(columns={"count": "n"})
+        tbl.group_by(group_cols + ["age_mid"])
+        .aggregate([("value", "count"), ("value", "mean"), ("value", "stddev", pc.VarianceOptions(ddof=1))])
+        .to_pandas()
+        .rename(columns={"value_count": "n", "value_mean": "mean", "value_stddev": "std"})
+        .sort_values(group_cols + ["age_mid"], kind="stable")
+    )
+    codes = np.searchsorted(AGE_MIDS, grouped["age_mid"].to_numpy())
+    grouped.insert(
+        len(group_cols),
+        "age_bin",
+        pd.Categorical.from_codes(codes, categories=AGE_LABELS, ordered=True),
     )
+    grouped = grouped[group_cols + ["age_bin", "age_mid", "n", "mean", "std"]].reset_index(drop=True)
 
     grouped["cv"] = grouped["std"] / grouped["mean"].abs()
     grouped.loc[grouped["mean"].abs() < 1e-8, "cv"] = np.nan
@@ -46,48 +67,93 @@ def compute_binned(df: pd.DataFrame) -> pd.DataFrame:
     return grouped
 
 
-def slope(x: np.ndarray, y: np.ndarray) -> float:
-    if len(x) < 2:
-        return np.nan
-    coef = np.polyfit(x, y, 1)
-    return float(coef[0])
+TREND_KEYS = ["biomarker_id", "biomarker_name"]
+TREND_COLUMNS = TREND_KEYS + [
+    "n_bins",
+    "spearman_rho",
+    "spearman_p",
+    "linear_slope_cv_per_year",
+    "linear_slope_logcv_per_year",
+    "decline_flag",
+]
+
+
+def grouped_spearman(df: pd.DataFrame, keys: list[str], x_col: str, y_col: str) -> pd.DataFrame:
+    """Spearman rho/p per group as Pearson correlation of within-group ranks (ties averaged)."""
+    grouped = df.groupby(keys, observed=True)
+    rx = grouped[x_col].rank()
+    ry = grouped[y_col].rank()
+    sums = (
+        df[keys]
+        .assign(rx=rx, ry=ry, rxy=rx * ry, rxx=rx * rx, ryy=ry * ry)
+        .groupby(keys, observed=True)
+        .agg(
+            n=("rx", "size"),
+            sx=("rx", "sum"),
+            sy=("ry", "sum"),
+            sxy=("rxy", "sum"),
+            sxx=("rxx", "sum"),
+            syy=("ryy", "sum"),
+        )
+    )
+    # scipy's spearmanr propagates NaN: any missing x/y makes the whole group's rho/p NaN
+    # (the sums above would otherwise silently skip those rows while n still counts them).
+    has_nan = df[keys].assign(nan=df[x_col].isna() | df[y_col].isna()).groupby(keys, observed=True)["nan"].any()
+    n = sums["n"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sums["sxy"].to_numpy() - sums["sx"].to_numpy() * sums["sy"].to_numpy() / n
+        var_x = sums["sxx"].to_numpy() - sums["sx"].to_numpy() ** 2 / n
+        var_y = sums["syy"].to_numpy() - sums["sy"].to_numpy() ** 2 / n
+        rho = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+        rho[(n < 2) | (var_x <= 0) | (var_y <= 0) | has_nan.to_numpy()] = np.nan
+        dof = n - 2
+        t_stat = rho * np.sqrt(dof / ((1.0 + rho) * (1.0 - rho)))
+        pval = 2 * student_t.sf(np.abs(t_stat), dof)
+    return pd.DataFrame(
+        {"n_bins": sums["n"].astype(int).to_numpy(), "spearman_rho": rho, "spearman_p": pval},
+        index=sums.index,
+    ).reset_index()
+
+
+def grouped_slope(df: pd.DataFrame, keys: list[str], x_col: str, y_col: str) -> pd.Series:
+    """Least-squares slope of y on x per group from centered grouped sums (NaN if < 2 points)."""
+    grouped = df.groupby(keys, observed=True)
+    dx = df[x_col] - grouped[x_col].transform("mean")
+    dy = df[y_col] - grouped[y_col].transform("mean")
+    # Like np.polyfit, any missing x/y makes the group's slope NaN (the skipna sums would mix row sets).
+    sums = df[keys].assign(sxy=dx * dy, sxx=dx * dx, nan=dx.isna() | dy.isna()).groupby(keys, observed=True).agg(
+        n=("sxx", "size"), sxy=("sxy", "sum"), sxx=("sxx", "sum"), has_nan=("nan", "any")
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = sums["sxy"] / sums["sxx"]
+    return out.where((sums["n"] >= 2) & (sums["sxx"] > 0) & ~sums["has_nan"])
 
 
 def compute_trends(cv_df: pd.DataFrame) -> pd.DataFrame:
-    eligible = cv_df[cv_df["passes_n_threshold"]].copy()
-
-    rows = []
-    for (bid, bname), g in eligible.groupby(["biomarker_id", "biomarker_name"], observed=True):
-        g = g.sort_values("age_mid")
-        x = g["age_mid"].to_numpy(dtype=float)
-        y = g["cv"].to_numpy(dtype=float)
-        pos = y > 0
-
-        rho, p = (np.nan, np.nan)
-        if len(y) >= 2:
-            rho, p = spearmanr(x, y)
-
-        row = {
-            "biomarker_id": bid,
-            "biomarker_name": bname,
-            "n_bins": int(len(g)),
-            "spearman_rho": float(rho) if pd.notna(rho) else np.nan,
-            "spearman_p": float(p) if pd.notna(p) else np.nan,
-            "linear_slope_cv_per_year": slope(x, y),
-            "linear_slope_logcv_per_year": slope(x[pos], np.log(y[pos])) if pos.sum() >= 2 else np.nan,
-        }
-        row["decline_flag"] = bool(
-            row["n_bins"] >= 5
-            and pd.notna(row["spearman_rho"])
-            and pd.notna(row["spearman_p"])
-            and row["spearman_rho"] < 0
-            and row["spearman_p"] < 0.05
-            and pd.notna(row["linear_slope_cv_per_year"])
-            and row["linear_slope_cv_per_year"] < 0
-        )
-        rows.append(row)
+    # Boolean .loc already yields a fresh frame and the grouped helpers never mutate it, so no
+    # defensive copy; only the columns the trend statistics read are carried along.
+    eligible = cv_df.loc[cv_df["passes_n_threshold"], TREND_KEYS + ["age_mid", "cv"]]
+    if eligible.empty:
+        return pd.DataFrame(columns=TREND_COLUMNS)
+
+    out = grouped_spearman(eligible, TREND_KEYS, "age_mid", "cv").set_index(TREND_KEYS)
+    out["linear_slope_cv_per_year"] = grouped_slope(eligible, TREND_KEYS, "age_mid", "cv")
+    pos = eligible[eligible["cv"] > 0].assign(log_cv=lambda d: np.log(d["cv"]))
+    out["linear_slope_logcv_per_year"] = grouped_slope(pos, TREND_KEYS, "age_mid", "log_cv")
+    out = out.reset_index()
+    out["decline_flag"] = (
+        (out["n_bins"] >= 5)
+        & (out["spearman_rho"] < 0)
+        & (out["spearman_p"] < 0.05)
+        & (out["linear_slope_cv_per_year"] < 0)
+    )
+    return out[TREND_COLUMNS]
+
 
-    return pd.DataFrame(rows)
+def write_parquet(df: pd.DataFrame, path: Path) -> None:
+    # zstd + 8192-row groups: smaller than the default snappy single group and lets readers skip row groups.
+    tbl = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(tbl, path, compression="zstd", compression_level=3, row_group_size=8192, use_dictionary=True)
 
 
 def main() -> None:
@@ -102,12 +168,12 @@ def main() -> None:
     df = pd.read_parquet(args.input_path)
     cv_all = compute_binned(df)
 
-    cv_all.to_parquet(out_dir / "cv_by_age_all.parquet", index=False)
+    write_parquet(cv_all, out_dir / "cv_by_age_all.parquet")
     cv_main = cv_all[cv_all["passes_n_threshold"]].copy()
-    cv_main.to_parquet(out_dir / "cv_by_age.parquet", index=False)
+    write_parquet(cv_main, out_dir / "cv_by_age.parquet")
 
     trends = compute_trends(cv_all)
-    trends.to_parquet(out_dir / "cv_trend_metrics.parquet", index=False)
+    write_parquet(trends, out_dir / "cv_trend_metrics.parquet")
 
     print(f"cv_by_age_all rows: {len(cv_all):,}")
     print(f"cv_by_age rows (n>=30): {len(cv_main):,}")
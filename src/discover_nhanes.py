@@ -4,12 +4,13 @@
 from __future__ import annotations
 
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import pandas as pd
 import urllib3
 
-from nhanes_common import apply_blood_candidate_rule, ensure_dir, parse_component_datapage, parse_variablelist
+from nhanes_common import blood_candidate_mask, ensure_dir, http_session, parse_component_datapage, parse_variablelist
 
 
 def build_manifest(component: str, verify_ssl: bool = False) -> pd.DataFrame:
@@ -40,14 +41,11 @@ def build_manifest(component: str, verify_ssl: bool = False) -> pd.DataFrame:
 
     merged["data_file_desc"] = merged["data_file_desc"].fillna(merged["data_file_desc_from_varlist"])
 
-    merged["is_blood_candidate"] = merged.apply(
-        lambda r: apply_blood_candidate_rule(
-            data_file_desc=str(r.get("data_file_desc", "")),
-            variable_desc=str(r.get("variable_desc", "")),
-            use_constraints=str(r.get("use_constraints", "")),
-            variable_name=str(r.get("variable_name", "")),
-        ),
-        axis=1,
+    merged["is_blood_candidate"] = blood_candidate_mask(
+        data_file_desc=merged["data_file_desc"],
+        variable_desc=merged["variable_desc"],
+        use_constraints=merged["use_constraints"],
+        variable_name=merged["variable_name"],
     )
 
     cols = [
@@ -71,17 +69,20 @@ def build_manifest(component: str, verify_ssl: bool = False) -> pd.DataFrame:
     return out
 
 
-def verify_sample_urls(df: pd.DataFrame, n: int, verify_ssl: bool = False) -> pd.DataFrame:
-    import requests
-
+def verify_sample_urls(df: pd.DataFrame, n: int, verify_ssl: bool = False, workers: int = 32) -> pd.DataFrame:
     sampled = df[["xpt_url"]].drop_duplicates().head(n).copy()
-    statuses = []
-    for url in sampled["xpt_url"]:
+    session = http_session(pool_size=workers)
+
+    def head_status(url: str) -> int | None:
         try:
-            resp = requests.head(url, timeout=30, verify=verify_ssl, allow_redirects=True)
-            statuses.append(resp.status_code)
+            resp = session.head(url, timeout=30, verify=verify_ssl, allow_redirects=True)
+            return resp.status_code
         except Exception:
-            statuses.append(None)
+            return None
+
+    # HEAD checks are pure round-trip latency, so issue them concurrently over keep-alive connections.
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        statuses = list(ex.map(head_status, sampled["xpt_url"]))
     sampled["http_status"] = statuses
     return sampled
 
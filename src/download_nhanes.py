@@ -4,7 +4,9 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -12,7 +14,9 @@ import pandas as pd
 import requests
 import urllib3
 
-from nhanes_common import cycle_year_from_url, ensure_dir, parse_component_datapage, sha256_file
+from nhanes_common import cycle_year_from_url, ensure_dir, http_session, parse_component_datapage, sha256_file
+
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
 
 
 def select_download_urls(manifest_df: pd.DataFrame, verify_ssl: bool = False) -> pd.DataFrame:
@@ -44,21 +48,37 @@ def select_download_urls(manifest_df: pd.DataFrame, verify_ssl: bool = False) ->
     return all_files.reset_index(drop=True)
 
 
-def download_one(url: str, out_path: Path, verify_ssl: bool = False, timeout: int = 180) -> tuple[int, int, str]:
+def download_one(
+    url: str,
+    out_path: Path,
+    verify_ssl: bool = False,
+    timeout: int = 180,
+    session: requests.Session | None = None,
+) -> tuple[int, int, str]:
     ensure_dir(out_path.parent)
 
     if out_path.exists() and out_path.stat().st_size > 0:
         checksum = sha256_file(out_path)
         return 200, out_path.stat().st_size, checksum
 
-    resp = requests.get(url, timeout=timeout, verify=verify_ssl)
-    status = resp.status_code
-    if status != 200:
-        return status, 0, ""
-
-    out_path.write_bytes(resp.content)
-    checksum = sha256_file(out_path)
-    return status, out_path.stat().st_size, checksum
+    # Stream in 1 MiB chunks, hashing as we write so peak memory stays flat and fresh
+    # downloads are never read back. The partial file is only renamed into place once
+    # complete, keeping the size>0 cache check above safe.
+    tmp_path = out_path.with_name(out_path.name + ".part")
+    h = hashlib.sha256()
+    n_bytes = 0
+    http = session or requests
+    with http.get(url, timeout=timeout, verify=verify_ssl, stream=True) as resp:
+        status = resp.status_code
+        if status != 200:
+            return status, 0, ""
+        with tmp_path.open("wb") as f:
+            for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                f.write(chunk)
+                h.update(chunk)
+                n_bytes += len(chunk)
+    tmp_path.replace(out_path)
+    return status, n_bytes, h.hexdigest()
 
 
 def main() -> None:
@@ -67,6 +87,7 @@ def main() -> None:
     ap.add_argument("--out", default="data/raw")
     ap.add_argument("--download-manifest", default="data/processed/download_manifest.csv")
     ap.add_argument("--verify-ssl", action="store_true")
+    ap.add_argument("--workers", type=int, default=16, help="Concurrent downloads")
     args = ap.parse_args()
     if not args.verify_ssl:
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -80,31 +101,47 @@ def main() -> None:
     manifest_df = pd.read_parquet(manifest_path)
     urls_df = select_download_urls(manifest_df, verify_ssl=args.verify_ssl)
 
-    records = []
-    total = len(urls_df)
-    for i, (_, row) in enumerate(urls_df.iterrows(), start=1):
-        url = row["xpt_url"]
-        year = int(row["cycle_start_year"])
-        fname = Path(url).name
-        out_path = out_dir / str(year) / fname
-
-        status, n_bytes, checksum = download_one(url, out_path=out_path, verify_ssl=args.verify_ssl)
-        records.append(
-            {
-                "timestamp_utc": datetime.now(timezone.utc).isoformat(),
-                "source": row["source"],
-                "cycle_start_year": year,
-                "data_file_name": row.get("data_file_name", Path(fname).stem),
-                "url": url,
-                "status": status,
-                "bytes": n_bytes,
-                "sha256": checksum,
-                "output_path": str(out_path),
-            }
-        )
-        if i % 50 == 0 or i == total:
-            ok_so_far = sum(1 for r in records if r["status"] == 200)
-            print(f"[{i}/{total}] ok={ok_so_far}")
+    urls = urls_df["xpt_url"].tolist()
+    years = urls_df["cycle_start_year"].astype(int).tolist()
+    sources = urls_df["source"].tolist()
+    if "data_file_name" in urls_df.columns:
+        names = urls_df["data_file_name"].tolist()
+    else:
+        names = [Path(url).stem for url in urls]
+    jobs = [
+        (url, year, source, name, out_dir / str(year) / Path(url).name)
+        for url, year, source, name in zip(urls, years, sources, names)
+    ]
+
+    session = http_session(pool_size=args.workers)
+
+    def fetch(job: tuple) -> dict:
+        url, year, source, data_file_name, out_path = job
+        status, n_bytes, checksum = download_one(url, out_path=out_path, verify_ssl=args.verify_ssl, session=session)
+        return {
+            "timestamp_utc": datetime.now(timezone.utc).isoformat(),
+            "source": source,
+            "cycle_start_year": year,
+            "data_file_name": data_file_name,
+            "url": url,
+            "status": status,
+            "bytes": n_bytes,
+            "sha256": checksum,
+            "output_path": str(out_path),
+        }
+
+    # Files are independent, so overlap HTTP round trips; records keep manifest order.
+    total = len(jobs)
+    records: list[dict] = [{}] * total
+    ok_so_far = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as ex:
+        futures = {ex.submit(fetch, job): idx for idx, job in enumerate(jobs)}
+        for i, fut in enumerate(as_completed(futures), start=1):
+            rec = fut.result()
+            records[futures[fut]] = rec
+            ok_so_far += int(rec["status"] == 200)
+            if i % 50 == 0 or i == total:
+                print(f"[{i}/{total}] ok={ok_so_far}")
 
     out_df = pd.DataFrame(records)
     out_df.to_csv(dl_manifest_path, index=False)
@@ -4,18 +4,30 @@
 from __future__ import annotations
 
 import hashlib
-import io
+import os
 import re
+import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional
 
+import lxml.html
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
 import urllib3
 
 BASE = "https://wwwn.cdc.gov"
+HTML_CACHE_DIR = Path(os.environ.get("NHANES_HTML_CACHE", Path.home() / ".cache" / "nhanes"))
+HTML_CACHE_TTL_SECONDS = 24 * 3600
+
+_YEAR_RE = re.compile(r"(19\d{2}|20\d{2})")
+_CYCLE_RE = re.compile(r"/Public/(\d{4})/DataFiles/")
+_UNIT_RE = re.compile(r"\(([^)]+)\)")
+# pd.read_html's default NA tokens; NHANES shows "None" in Use Constraints for public variables.
+_HTML_NA_VALUES = frozenset(
+    ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+     "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"]
+)
 
 
 @dataclass(frozen=True)
@@ -30,16 +42,45 @@ class ComponentRow:
     date_published: str
 
 
-def fetch_html(url: str, verify_ssl: bool = False, timeout: int = 120) -> str:
+def http_session(pool_size: int = 32) -> requests.Session:
+    """Session whose HTTPS pool can keep one keep-alive connection per worker thread."""
+    sess = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    sess.mount("https://", adapter)
+    sess.mount("http://", adapter)
+    return sess
+
+
+def fetch_html(
+    url: str,
+    verify_ssl: bool = False,
+    timeout: int = 120,
+    cache_ttl: float = HTML_CACHE_TTL_SECONDS,
+) -> str:
+    """GET ``url`` as text, reusing a copy under HTML_CACHE_DIR younger than ``cache_ttl`` seconds (0 disables)."""
+    cache_path = HTML_CACHE_DIR / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.html"
+    if cache_ttl > 0 and cache_path.exists() and time.time() - cache_path.stat().st_mtime < cache_ttl:
+        return cache_path.read_text(encoding="utf-8")
+
     if not verify_ssl:
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
     resp = requests.get(url, timeout=timeout, verify=verify_ssl)
     resp.raise_for_status()
-    return resp.text
+    html = resp.text
+
+    if cache_ttl > 0:
+        try:
+            ensure_dir(cache_path.parent)
+            tmp_path = cache_path.with_name(cache_path.name + ".part")
+            tmp_path.write_text(html, encoding="utf-8")
+            tmp_path.replace(cache_path)
+        except OSError:
+            pass  # The cache is only an optimization; an unwritable location must not fail the run.
+    return html
 
 
 def parse_cycle_years(cycle_label: str) -> tuple[int, int]:
-    years = [int(y) for y in re.findall(r"(19\d{2}|20\d{2})", cycle_label)]
+    years = [int(y) for y in _YEAR_RE.findall(cycle_label)]
     if len(years) >= 2:
         return years[0], years[-1]
     if len(years) == 1:
@@ -56,33 +97,35 @@ def file_stem_from_url(url: str) -> str:
 
 
 def cycle_year_from_url(url: str) -> Optional[int]:
-    m = re.search(r"/Public/(\d{4})/DataFiles/", url)
+    m = _CYCLE_RE.search(url)
     return int(m.group(1)) if m else None
 
 
+def node_text(node) -> str:
+    """Stripped text fragments joined by single spaces (BeautifulSoup ``get_text(" ", strip=True)``)."""
+    return " ".join(t.strip() for t in node.itertext() if t.strip())
+
+
 def parse_component_datapage(component: str, verify_ssl: bool = False) -> pd.DataFrame:
     url = f"{BASE}/nchs/nhanes/search/DataPage.aspx?Component={component}"
     html = fetch_html(url, verify_ssl=verify_ssl)
-    soup = BeautifulSoup(html, "html.parser")
-
-    table = soup.find("table", {"id": "GridView1"})
-    if table is None:
+    tables = lxml.html.fromstring(html).xpath('//table[@id="GridView1"]')
+    if not tables:
         raise RuntimeError(f"GridView1 table not found for component={component}")
 
     rows: List[ComponentRow] = []
-    for tr in table.find_all("tr"):
-        tds = tr.find_all("td")
-        if len(tds) != 5:
-            continue
-
-        cycle_label = tds[0].get_text(" ", strip=True)
-        data_file_desc = tds[1].get_text(" ", strip=True)
-        doc_anchor = tds[2].find("a")
-        data_anchor = tds[3].find("a")
-        date_published = tds[4].get_text(" ", strip=True)
-
-        if doc_anchor is None or data_anchor is None:
+    for tr in tables[0].xpath(".//tr[count(td)=5]"):
+        tds = tr.xpath("./td")
+        cycle_label = node_text(tds[0])
+        data_file_desc = node_text(tds[1])
+        doc_anchors = tds[2].xpath(".//a")
+        data_anchors = tds[3].xpath(".//a")
+        date_published = node_text(tds[4])
+
+        if not doc_anchors or not data_anchors:
             continue
+        doc_anchor = doc_anchors[0]
+        data_anchor = data_anchors[0]
 
         doc_href = doc_anchor.get("href", "")
         xpt_href = data_anchor.get("href", "")
@@ -111,10 +154,32 @@ def parse_component_datapage(component: str, verify_ssl: bool = False) -> pd.Dat
     return pd.DataFrame([r.__dict__ for r in rows])
 
 
+def html_table_to_frame(html: str) -> pd.DataFrame:
+    """First <table> as a string DataFrame (empty/NA-token cells -> None), skipping read_html's type inference."""
+    tables = lxml.html.fromstring(html).xpath("//table")
+    if not tables:
+        raise RuntimeError("No <table> found in HTML")
+    table = tables[0]
+
+    def cell_text(cell) -> str:
+        return " ".join(cell.text_content().split())
+
+    def value_text(cell) -> str | None:
+        txt = cell_text(cell)
+        return None if txt in _HTML_NA_VALUES else txt
+
+    header_rows = table.xpath(".//tr[th]")
+    if not header_rows:
+        raise RuntimeError("No header row found in HTML table")
+    headers = [cell_text(c) for c in header_rows[0].xpath("./th")]
+    data = [[value_text(c) for c in tr.xpath("./td")] for tr in table.xpath(".//tr[td]")]
+    return pd.DataFrame(data, columns=headers)
+
+
 def parse_variablelist(component: str, verify_ssl: bool = False) -> pd.DataFrame:
     url = f"{BASE}/nchs/nhanes/search/variablelist.aspx?Component={component}&Cycle=%20"
     html = fetch_html(url, verify_ssl=verify_ssl)
-    df = pd.read_html(io.StringIO(html))[0]
+    df = html_table_to_frame(html)
     expected = {
         "Variable Name",
         "Variable Description",
@@ -132,8 +197,10 @@ def parse_variablelist(component: str, verify_ssl: bool = False) -> pd.DataFrame
 
 
 def sha256_file(path: Path) -> str:
-    h = hashlib.sha256()
     with path.open("rb") as f:
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+: C-level read/update loop.
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
         for chunk in iter(lambda: f.read(1024 * 1024), b""):
             h.update(chunk)
     return h.hexdigest()
@@ -148,25 +215,54 @@ def normalize_numeric_series(series: pd.Series) -> pd.Series:
 
 
 def parse_unit_from_label(label: str) -> str:
-    m = re.search(r"\(([^)]+)\)", label or "")
+    m = _UNIT_RE.search(label or "")
     return m.group(1).strip() if m else ""
 
 
+BLOOD_INCLUDE_TOKENS = ["blood", "serum", "plasma", "whole blood", "rbc", "wbc"]
+BLOOD_EXCLUDE_TOKENS = ["urine", "urinary", "saliva", "oral", "vaginal", "semen", "hair", "nail", "milk", "csf"]
+# Many blood analytes are coded with LBX/LBD-style names and do not mention "blood/serum" in every description.
+LAB_MARKER_PATTERN = r"\b(?:lbx[a-z0-9]*|lbd[a-z0-9]*|sst[a-z0-9]*|ss[a-z0-9]+)\b"
+BLOOD_INCLUDE_PATTERN = "|".join(map(re.escape, BLOOD_INCLUDE_TOKENS))
+BLOOD_EXCLUDE_PATTERN = "|".join(map(re.escape, BLOOD_EXCLUDE_TOKENS))
+_LAB_RE = re.compile(LAB_MARKER_PATTERN)
+ARROW_STRING = pd.StringDtype("pyarrow")
+
+
 def apply_blood_candidate_rule(data_file_desc: str, variable_desc: str, use_constraints: str, variable_name: str = "") -> bool:
     txt = f"{data_file_desc} {variable_desc} {variable_name}".lower()
     use_txt = (use_constraints or "").lower()
 
-    include_tokens = ["blood", "serum", "plasma", "whole blood", "rbc", "wbc"]
-    exclude_tokens = ["urine", "urinary", "saliva", "oral", "vaginal", "semen", "hair", "nail", "milk", "csf"]
-
-    has_include = any(tok in txt for tok in include_tokens)
-    has_exclude = any(tok in txt for tok in exclude_tokens)
-    # Many blood analytes are coded with LBX/LBD-style names and do not mention "blood/serum" in every description.
-    has_lab_marker = bool(re.search(r"\b(lbx[a-z0-9]*|lbd[a-z0-9]*|sst[a-z0-9]*|ss[a-z0-9]+)\b", txt))
+    has_include = any(tok in txt for tok in BLOOD_INCLUDE_TOKENS)
+    has_exclude = any(tok in txt for tok in BLOOD_EXCLUDE_TOKENS)
+    has_lab_marker = bool(_LAB_RE.search(txt))
     is_rdc = "rdc" in use_txt
     return bool((has_include or has_lab_marker) and not has_exclude and not is_rdc)
 
 
+def blood_candidate_mask(
+    data_file_desc: pd.Series,
+    variable_desc: pd.Series,
+    use_constraints: pd.Series,
+    variable_name: pd.Series,
+) -> pd.Series:
+    """Column-wise apply_blood_candidate_rule: one string pass per predicate instead of a lambda per row.
+
+    Arrow-backed strings route ``str.contains`` through PyArrow's RE2 kernels, which scan
+    each token alternation as a single linear-time automaton outside the GIL.
+    """
+
+    def as_text(s: pd.Series) -> pd.Series:
+        return s.fillna("").astype(str).astype(ARROW_STRING)
+
+    txt = (as_text(data_file_desc) + " " + as_text(variable_desc) + " " + as_text(variable_name)).str.lower()
+    has_include = txt.str.contains(BLOOD_INCLUDE_PATTERN, regex=True)
+    has_exclude = txt.str.contains(BLOOD_EXCLUDE_PATTERN, regex=True)
+    has_lab_marker = txt.str.contains(LAB_MARKER_PATTERN, regex=True)
+    is_rdc = as_text(use_constraints).str.lower().str.contains("rdc", regex=False)
+    return ((has_include | has_lab_marker) & ~has_exclude & ~is_rdc).astype(bool)
+
+
 def list_xpt_files(raw_dir: Path, pattern: str = "*.xpt") -> List[Path]:
     return sorted(raw_dir.rglob(pattern))
 
@@ -8,16 +8,19 @@ processed participant health flags table.
 from __future__ import annotations
 
 import argparse
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable
+from typing import TYPE_CHECKING, Iterable
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import requests
-from lifelines import KaplanMeierFitter
+import pyarrow.parquet as pq
 
-from nhanes_common import ensure_dir
+from nhanes_common import ensure_dir, http_session
+
+if TYPE_CHECKING:
+    from lifelines import KaplanMeierFitter
 
 
 MORTALITY_FILES = [
@@ -40,59 +43,175 @@ COHORT_COLORS = {
     "liver": "#dc2626",
     "asthma": "#059669",
 }
-
-
-def _km_time_at_survival_prob(kmf: KaplanMeierFitter, target_survival: float) -> float:
-    """Return first age where S(age) <= target_survival via linear interpolation."""
+# Based on NCHS Stata read-in program for NHANES 2019 linkage:
+# seqn 1-6, eligstat 15, mortstat 16, ucod 17-19, diabetes 20,
+# hyperten 21, permth_int 43-45, permth_exm 46-48.
+MORT_COLSPECS = [(0, 6), (14, 15), (15, 16), (16, 19), (19, 20), (20, 21), (42, 45), (45, 48)]
+MORT_NAMES = ["seqn", "eligstat", "mortstat", "ucod_leading", "diabetes_mcod", "hyperten_mcod", "permth_int", "permth_exm"]
+MORT_CACHE_NAME = "_mort_cache.parquet"
+PLOT_DPI = 120
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+JOIN_KEYS = ["seqn", "cycle_start_year"]
+CYCLE_DTYPE = pd.CategoricalDtype(sorted(int(fn.split("_")[1]) for fn in MORTALITY_FILES), ordered=True)
+FLAG_COLUMNS = ["diabetes", "kidney", "liver", "asthma"]
+
+
+def _km_times_at_survival_probs(kmf: KaplanMeierFitter, targets: Iterable[float]) -> np.ndarray:
+    """Return, per target, the first age where S(age) <= target via linear interpolation (NaN if never reached)."""
     surv = kmf.survival_function_.iloc[:, 0]
     times = surv.index.to_numpy(dtype=float)
     probs = surv.to_numpy(dtype=float)
-    hit = np.where(probs <= target_survival)[0]
-    if len(hit) == 0:
-        return float("nan")
-    i = int(hit[0])
-    if i == 0:
-        return float(times[0])
-    t0, t1 = float(times[i - 1]), float(times[i])
-    s0, s1 = float(probs[i - 1]), float(probs[i])
-    if s1 == s0:
-        return t1
-    w = (s0 - target_survival) / (s0 - s1)
-    return t0 + w * (t1 - t0)
+    targets = np.asarray(list(targets), dtype=float)
+    # S(t) is non-increasing, so -S is sorted and the first S <= target is a binary search.
+    hit = np.searchsorted(-probs, -targets, side="left")
+    reached = hit < probs.size
+    i = np.minimum(hit, probs.size - 1)
+    prev = np.maximum(i - 1, 0)  # i == 0 gives s0 == s1 below, i.e. times[0].
+    t0, t1 = times[prev], times[i]
+    s0, s1 = probs[prev], probs[i]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w = (s0 - targets) / (s0 - s1)
+        out = np.where(s1 == s0, t1, t0 + w * (t1 - t0))
+    out[~reached] = np.nan
+    return out
+
+
+def _fit_km_by_age(sub: pd.DataFrame, label: str) -> KaplanMeierFitter:
+    """Age-timescale KM with delayed entry at interview age."""
+    from lifelines import KaplanMeierFitter
+
+    return KaplanMeierFitter().fit(
+        durations=sub["end_age"].to_numpy(),
+        event_observed=sub["event"].to_numpy(),
+        entry=sub["entry_age"].to_numpy(),
+        label=label,
+    )
+
+
+def _agg_figure():
+    """One Agg-backed Figure, outside pyplot's figure manager, that every plot clears and redraws.
+
+    matplotlib is imported here so --no-plots runs never load it.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(dpi=PLOT_DPI)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _fresh_axes(fig, width: float, height: float):
+    fig.clear()
+    fig.set_size_inches(width, height)
+    return fig.add_subplot()
+
+
+def _plot_km_curve(kmf: KaplanMeierFitter, ax, color: str, linewidth: float) -> None:
+    kmf.plot_survival_function(ax=ax, ci_show=True, color=color, linewidth=linewidth)
+    # Step lines and CI bands carry one vertex per event time; rasterize them so
+    # vector outputs (.pdf/.svg) stay small and quick to render.
+    ax.get_lines()[-1].set_rasterized(True)
+    ax.collections[-1].set_rasterized(True)
+
+
+def _save_figure(fig, path: str) -> None:
+    # Low zlib level: PNG encode time dominates and the size difference is small for flat plots.
+    kwargs = {"pil_kwargs": {"compress_level": 1}} if Path(path).suffix.lower() == ".png" else {}
+    fig.savefig(path, **kwargs)
+
+
+def _join_keys(frame: pd.DataFrame) -> pd.DataFrame:
+    # int32 seqn and a 1-byte-coded cycle category hash faster than nullable Int64. Rows without
+    # a key (or from a cycle with no mortality file) can never match, and they would fail the
+    # eligstat == 1 filter after the left join anyway.
+    frame = frame.astype({"cycle_start_year": CYCLE_DTYPE}).dropna(subset=JOIN_KEYS)
+    return frame.astype({"seqn": "int32"})
 
 
 def to_num(s: pd.Series) -> pd.Series:
     return pd.to_numeric(s, errors="coerce")
 
 
-def download_mortality_files(out_dir: Path, files: Iterable[str]) -> None:
+def download_mortality_files(out_dir: Path, files: Iterable[str], workers: int = 8) -> None:
     ensure_dir(out_dir)
-    for fn in files:
-        p = out_dir / fn
-        if p.exists() and p.stat().st_size > 0:
-            continue
-        r = requests.get(MORT_BASE_URL + fn, timeout=120)
-        r.raise_for_status()
-        p.write_bytes(r.content)
-
-
-def load_mortality(mort_dir: Path, files: Iterable[str]) -> pd.DataFrame:
-    rows = []
-    # Based on NCHS Stata read-in program for NHANES 2019 linkage:
-    # seqn 1-6, eligstat 15, mortstat 16, ucod 17-19, diabetes 20,
-    # hyperten 21, permth_int 43-45, permth_exm 46-48.
-    colspecs = [(0, 6), (14, 15), (15, 16), (16, 19), (19, 20), (20, 21), (42, 45), (45, 48)]
-    names = ["seqn", "eligstat", "mortstat", "ucod_leading", "diabetes_mcod", "hyperten_mcod", "permth_int", "permth_exm"]
-    for fn in files:
-        p = mort_dir / fn
-        m = pd.read_fwf(p, colspecs=colspecs, names=names, dtype=str)
-        m["seqn"] = to_num(m["seqn"]).astype("Int64")
-        for c in names[1:]:
-            m[c] = to_num(m[c])
-        cycle_start = int(fn.split("_")[1])
-        m["cycle_start_year"] = cycle_start
-        rows.append(m)
-    return pd.concat(rows, ignore_index=True)
+    todo = [fn for fn in files if not ((out_dir / fn).exists() and (out_dir / fn).stat().st_size > 0)]
+    if not todo:
+        return
+    session = http_session(pool_size=workers)
+
+    def fetch(fn: str) -> None:
+        # Stream the raw body to a .part file (renamed when complete) instead of buffering
+        # r.content; identity encoding keeps r.raw byte-for-byte equal to the .dat file.
+        tmp_path = out_dir / (fn + ".part")
+        with session.get(MORT_BASE_URL + fn, timeout=120, stream=True, headers={"Accept-Encoding": "identity"}) as r:
+            r.raise_for_status()
+            with tmp_path.open("wb") as f:
+                shutil.copyfileobj(r.raw, f, length=DOWNLOAD_CHUNK_BYTES)
+        tmp_path.replace(out_dir / fn)
+
+    # One keep-alive pool for all cycles instead of a TLS handshake per file.
+    with ThreadPoolExecutor(max_workers=min(workers, len(todo))) as ex:
+        list(ex.map(fetch, todo))
+
+
+def _slice_fixed_width(raw: bytes) -> dict[str, np.ndarray] | None:
+    """Split equal-length newline-terminated records into per-field byte-string arrays (None if ragged)."""
+    reclen = raw.find(b"\n") + 1
+    if reclen <= MORT_COLSPECS[-1][1]:
+        return None
+    if not raw.endswith(b"\n"):
+        raw += b"\n"
+    if len(raw) % reclen:
+        return None
+    # One structured dtype mirrors the record layout, so every field is a zero-copy strided view.
+    rec_dtype = np.dtype(
+        {
+            "names": MORT_NAMES + ["eol"],
+            "formats": [f"S{end - start}" for start, end in MORT_COLSPECS] + ["S1"],
+            "offsets": [start for start, _ in MORT_COLSPECS] + [reclen - 1],
+            "itemsize": reclen,
+        }
+    )
+    recs = np.frombuffer(raw, dtype=rec_dtype)
+    if not (recs["eol"] == b"\n").all():
+        return None
+    return {name: recs[name] for name in MORT_NAMES}
+
+
+def parse_mortality_file(path: Path) -> pd.DataFrame:
+    fields = _slice_fixed_width(path.read_bytes())
+    if fields is None:
+        # Records with trimmed trailing blanks cannot be reshaped; use pandas' line parser.
+        m = pd.read_fwf(path, colspecs=MORT_COLSPECS, names=MORT_NAMES, dtype=str)
+    else:
+        m = pd.DataFrame({name: np.char.strip(col.astype(str)) for name, col in fields.items()})
+    m["seqn"] = to_num(m["seqn"]).astype("Int64")
+    m[MORT_NAMES[1:]] = m[MORT_NAMES[1:]].apply(to_num)
+    m["cycle_start_year"] = int(path.name.split("_")[1])
+    return m
+
+
+def load_mortality(mort_dir: Path, files: Iterable[str], columns: list[str] | None = None) -> pd.DataFrame:
+    """Stacked mortality records for ``files``; ``columns`` projects the result (cycle_start_year is always read)."""
+    paths = [mort_dir / fn for fn in files]
+    read_cols = None if columns is None else list(dict.fromkeys(columns + ["cycle_start_year"]))
+    # Parsed frame is cached beside the .dat files and reused while it is newer than all of them.
+    cache = mort_dir / MORT_CACHE_NAME
+    if cache.exists() and cache.stat().st_mtime > max(p.stat().st_mtime for p in paths):
+        mort = pd.read_parquet(cache, columns=read_cols)
+        if set(mort["cycle_start_year"].unique()) == {int(p.name.split("_")[1]) for p in paths}:
+            return mort if columns is None else mort[columns]
+
+    # Cycles are independent; file reads and NumPy byte slicing overlap across threads.
+    with ThreadPoolExecutor(max_workers=min(8, len(paths))) as ex:
+        rows = list(ex.map(parse_mortality_file, paths))
+    mort = pd.concat(rows, ignore_index=True, copy=False)
+    try:
+        mort.to_parquet(cache, compression="snappy", index=False)
+    except OSError:
+        pass  # Cache is only an optimization; a read-only mortality dir must not fail the run.
+    return mort if columns is None else mort[columns]
 
 
 def main() -> None:
@@ -107,47 +226,59 @@ def main() -> None:
     ap.add_argument("--csv-asthma-age-out", default="output/km_asthma_counts_by_age.csv")
     ap.add_argument("--age-summary-csv-out", default="output/km_kidney_liver_age_summary.csv")
     ap.add_argument("--steepness-png-out", default="output/steepness_longevity_disease.png")
+    ap.add_argument("--no-plots", action="store_true", help="Write the CSV outputs only (skips matplotlib)")
     args = ap.parse_args()
+    make_plots = not args.no_plots
 
-    part = pd.read_parquet(args.participants)
-    required = {"seqn", "cycle_start_year", "age_years", "kidney", "liver", "diabetes"}
-    missing = required.difference(set(part.columns))
+    required = ["seqn", "cycle_start_year", "age_years", "kidney", "liver", "diabetes"]
+    available = set(pq.read_schema(args.participants).names)
+    missing = set(required).difference(available)
     if missing:
         raise RuntimeError(f"participant file missing required columns: {sorted(missing)}")
+    # Read only the columns used below and let PyArrow drop under-20 rows while scanning.
+    columns = required + (["asthma"] if "asthma" in available else [])
+    part = pd.read_parquet(args.participants, columns=columns, filters=[("age_years", ">=", 20)])
     if "asthma" not in part.columns:
         part["asthma"] = False
-
-    part = part.copy()
-    part = part[part["age_years"] >= 20].copy()
+    # Materialize cohort flags once as plain numpy bools (missing = not flagged, as `== True` treated them).
+    for k in FLAG_COLUMNS:
+        part[k] = (part[k] == True).fillna(False).to_numpy(dtype=bool)  # noqa: E712
 
     mort_dir = Path(args.mortality_dir)
     download_mortality_files(mort_dir, MORTALITY_FILES)
-    mort = load_mortality(mort_dir, MORTALITY_FILES)
+    # Cause-of-death fields are not used here; leave them out of the join.
+    mort = load_mortality(mort_dir, MORTALITY_FILES, columns=JOIN_KEYS + ["eligstat", "mortstat", "permth_int", "permth_exm"])
 
-    df = part.merge(mort, on=["seqn", "cycle_start_year"], how="left")
-    df = df[df["eligstat"] == 1].copy()
-    df["time_months"] = df["permth_int"].where(df["permth_int"].notna(), df["permth_exm"])
-    df["event"] = (df["mortstat"] == 1).astype(int)
-    df = df[df["time_months"].notna()].copy()
+    df = _join_keys(part).merge(_join_keys(mort), on=JOIN_KEYS, how="left")
+    df = df[df["eligstat"] == 1]
+    permth_int = df["permth_int"].to_numpy(dtype=float)
+    time_months = np.where(np.isnan(permth_int), df["permth_exm"].to_numpy(dtype=float), permth_int)
+    df = df.assign(time_months=time_months, event=(df["mortstat"] == 1).astype(int))
+    df = df[~np.isnan(time_months)]
 
     cohorts = [
-        ("full", "Full cohort (age>=20, eligstat=1)", pd.Series(True, index=df.index), COHORT_COLORS["full"]),
-        ("diabetes", "Diabetes (DIQ010=1)", df["diabetes"] == True, COHORT_COLORS["diabetes"]),  # noqa: E712
-        ("kidney", "Kidney disease (KIQ022=1)", df["kidney"] == True, COHORT_COLORS["kidney"]),  # noqa: E712
-        ("liver", "Liver disease (MCQ160L/MCQ500/MCQ510*=1)", df["liver"] == True, COHORT_COLORS["liver"]),  # noqa: E712
+        ("full", "Full cohort (age>=20, eligstat=1)", None, COHORT_COLORS["full"]),
+        ("diabetes", "Diabetes (DIQ010=1)", df["diabetes"], COHORT_COLORS["diabetes"]),
+        ("kidney", "Kidney disease (KIQ022=1)", df["kidney"], COHORT_COLORS["kidney"]),
+        ("liver", "Liver disease (MCQ160L/MCQ500/MCQ510*=1)", df["liver"], COHORT_COLORS["liver"]),
     ]
 
-    ensure_dir(Path(args.png_out).parent)
-    fig, ax = plt.subplots(figsize=(10, 7), dpi=150)
-    kmf = KaplanMeierFitter()
+    if make_plots:
+        from lifelines import KaplanMeierFitter
+
+        fig = _agg_figure()
+        ensure_dir(Path(args.png_out).parent)
+        ax = _fresh_axes(fig, 10, 7)
+        kmf = KaplanMeierFitter()
     count_rows = []
 
     for key, label, mask, color in cohorts:
-        sub = df.loc[mask].copy()
+        sub = df if mask is None else df.loc[mask]
         if sub.empty:
             continue
-        kmf.fit(sub["time_months"], event_observed=sub["event"], label=label)
-        kmf.plot_survival_function(ax=ax, ci_show=True, color=color, linewidth=2)
+        if make_plots:
+            kmf.fit(sub["time_months"].to_numpy(), event_observed=sub["event"].to_numpy(), label=label)
+            _plot_km_curve(kmf, ax, color, linewidth=2)
         count_rows.append(
             {
                 "cohort": label,
@@ -158,54 +289,47 @@ def main() -> None:
             }
         )
 
-    ax.set_title("NHANES Kaplan-Meier Survival: Diabetes/Kidney/Liver vs Full Cohort")
-    ax.set_xlabel("Follow-up time (months, from interview)")
-    ax.set_ylabel("Survival probability")
-    ax.set_ylim(0, 1.0)
-    ax.grid(alpha=0.25)
-    ax.legend(loc="best", frameon=False)
-    fig.tight_layout()
-    fig.savefig(args.png_out)
-    plt.close(fig)
+    if make_plots:
+        ax.set_title("NHANES Kaplan-Meier Survival: Diabetes/Kidney/Liver vs Full Cohort")
+        ax.set_xlabel("Follow-up time (months, from interview)")
+        ax.set_ylabel("Survival probability")
+        ax.set_ylim(0, 1.0)
+        ax.grid(alpha=0.25)
+        ax.legend(loc="best", frameon=False)
+        fig.tight_layout()
+        _save_figure(fig, args.png_out)
 
     ensure_dir(Path(args.csv_out).parent)
     pd.DataFrame(count_rows).to_csv(args.csv_out, index=False)
 
     # Age-timescale KM (delayed entry / left truncation): each participant enters
     # the risk set at interview age and exits at age-at-death or age-at-censoring.
-    df_age = df[df["age_years"].notna()].copy()
-    df_age["entry_age"] = pd.to_numeric(df_age["age_years"], errors="coerce")
-    df_age["end_age"] = df_age["entry_age"] + (pd.to_numeric(df_age["time_months"], errors="coerce") / 12.0)
-    df_age = df_age[df_age["entry_age"].notna() & df_age["end_age"].notna()].copy()
-    df_age = df_age[df_age["end_age"] > df_age["entry_age"]].copy()
+    entry_age = pd.to_numeric(df["age_years"], errors="coerce")
+    df_age = df.assign(entry_age=entry_age, end_age=entry_age + pd.to_numeric(df["time_months"], errors="coerce") / 12.0)
+    df_age = df_age[df_age["entry_age"].notna() & df_age["end_age"].notna() & (df_age["end_age"] > df_age["entry_age"])]
 
     cohorts_age = [
-        ("full", "Full cohort (age>=20, eligstat=1)", pd.Series(True, index=df_age.index), COHORT_COLORS["full"]),
-        ("diabetes", "Diabetes (DIQ010=1)", df_age["diabetes"] == True, COHORT_COLORS["diabetes"]),  # noqa: E712
-        ("kidney", "Kidney disease (KIQ022=1)", df_age["kidney"] == True, COHORT_COLORS["kidney"]),  # noqa: E712
-        ("liver", "Liver disease (MCQ160L/MCQ500/MCQ510*=1)", df_age["liver"] == True, COHORT_COLORS["liver"]),  # noqa: E712
+        ("full", "Full cohort (age>=20, eligstat=1)", None, COHORT_COLORS["full"]),
+        ("diabetes", "Diabetes (DIQ010=1)", df_age["diabetes"], COHORT_COLORS["diabetes"]),
+        ("kidney", "Kidney disease (KIQ022=1)", df_age["kidney"], COHORT_COLORS["kidney"]),
+        ("liver", "Liver disease (MCQ160L/MCQ500/MCQ510*=1)", df_age["liver"], COHORT_COLORS["liver"]),
     ]
 
-    ensure_dir(Path(args.png_age_out).parent)
-    fig_age, ax_age = plt.subplots(figsize=(10, 7), dpi=150)
-    kmf_age = KaplanMeierFitter()
+    if make_plots:
+        ensure_dir(Path(args.png_age_out).parent)
+        ax_age = _fresh_axes(fig, 10, 7)
+    age_fits: dict[str, KaplanMeierFitter] = {}
     count_rows_age = []
     age_summary_rows = []
 
     for key, label, mask, color in cohorts_age:
-        sub = df_age.loc[mask].copy()
+        sub = df_age if mask is None else df_age.loc[mask]
         if sub.empty:
             continue
-        kmf_age.fit(
-            durations=sub["end_age"],
-            event_observed=sub["event"],
-            entry=sub["entry_age"],
-            label=label,
-        )
-        kmf_age.plot_survival_function(ax=ax_age, ci_show=True, color=color, linewidth=2)
-        median_age = float(_km_time_at_survival_prob(kmf_age, 0.5))
-        q1_age = float(_km_time_at_survival_prob(kmf_age, 0.75))
-        q3_age = float(_km_time_at_survival_prob(kmf_age, 0.25))
+        kmf_age = age_fits[key] = _fit_km_by_age(sub, label)
+        if make_plots:
+            _plot_km_curve(kmf_age, ax_age, color, linewidth=2)
+        q1_age, median_age, q3_age = (float(v) for v in _km_times_at_survival_probs(kmf_age, (0.75, 0.5, 0.25)))
         iqr_age = q3_age - q1_age if np.isfinite(q1_age) and np.isfinite(q3_age) else float("nan")
         steepness = (
             median_age / iqr_age
@@ -237,15 +361,15 @@ def main() -> None:
             }
         )
 
-    ax_age.set_title("NHANES Kaplan-Meier Survival by Age: Diabetes/Kidney/Liver vs Full Cohort")
-    ax_age.set_xlabel("Age (years)")
-    ax_age.set_ylabel("Survival probability")
-    ax_age.set_ylim(0, 1.0)
-    ax_age.grid(alpha=0.25)
-    ax_age.legend(loc="best", frameon=False)
-    fig_age.tight_layout()
-    fig_age.savefig(args.png_age_out)
-    plt.close(fig_age)
+    if make_plots:
+        ax_age.set_title("NHANES Kaplan-Meier Survival by Age: Diabetes/Kidney/Liver vs Full Cohort")
+        ax_age.set_xlabel("Age (years)")
+        ax_age.set_ylabel("Survival probability")
+        ax_age.set_ylim(0, 1.0)
+        ax_age.grid(alpha=0.25)
+        ax_age.legend(loc="best", frameon=False)
+        fig.tight_layout()
+        _save_figure(fig, args.png_age_out)
 
     ensure_dir(Path(args.csv_age_out).parent)
     pd.DataFrame(count_rows_age).to_csv(args.csv_age_out, index=False)
@@ -255,31 +379,31 @@ def main() -> None:
     summary_df.to_csv(args.age_summary_csv_out, index=False)
 
     full_row = summary_df.loc[summary_df["cohort_key"] == "full"]
-    if not full_row.empty:
+    if make_plots and not full_row.empty:
         median_full = float(full_row["median_age_years"].iloc[0])
         steep_full = float(full_row["steepness_median_over_iqr"].iloc[0])
-        rel_df = summary_df[summary_df["cohort_key"].isin(["diabetes", "kidney", "liver"])].copy()
-        rel_df["relative_median_longevity"] = rel_df["median_age_years"] / median_full
-        rel_df["relative_steepness"] = rel_df["steepness_median_over_iqr"] / steep_full
-        rel_df = rel_df[np.isfinite(rel_df["relative_median_longevity"]) & np.isfinite(rel_df["relative_steepness"])].copy()
+        rel_df = summary_df[summary_df["cohort_key"].isin(["diabetes", "kidney", "liver"])].assign(
+            relative_median_longevity=lambda d: d["median_age_years"] / median_full,
+            relative_steepness=lambda d: d["steepness_median_over_iqr"] / steep_full,
+        )
+        rel_df = rel_df[np.isfinite(rel_df["relative_median_longevity"]) & np.isfinite(rel_df["relative_steepness"])]
 
         ensure_dir(Path(args.steepness_png_out).parent)
-        fig_rel, ax_rel = plt.subplots(figsize=(8.5, 7), dpi=160)
-        for _, row in rel_df.iterrows():
-            key = str(row["cohort_key"])
-            x = float(row["relative_median_longevity"])
-            y = float(row["relative_steepness"])
-            ax_rel.scatter(
-                x,
-                y,
-                s=320,
-                color=COHORT_COLORS[key],
-                alpha=0.9,
-                edgecolor="white",
-                linewidth=1.2,
-                zorder=3,
-            )
-            ax_rel.text(x, y + 0.02, row["cohort"].split(" (")[0], ha="center", va="bottom", fontsize=11)
+        ax_rel = _fresh_axes(fig, 8.5, 7)
+        xs = rel_df["relative_median_longevity"].to_numpy(dtype=float)
+        ys = rel_df["relative_steepness"].to_numpy(dtype=float)
+        ax_rel.scatter(
+            xs,
+            ys,
+            s=320,
+            c=rel_df["cohort_key"].map(COHORT_COLORS).tolist(),
+            alpha=0.9,
+            edgecolor="white",
+            linewidth=1.2,
+            zorder=3,
+        )
+        for x, y, label in zip(xs, ys, rel_df["cohort"]):
+            ax_rel.text(x, y + 0.02, label.split(" (")[0], ha="center", va="bottom", fontsize=11)
 
         ax_rel.axvline(1.0, color="#64748b", linestyle="--", linewidth=1.4)
         ax_rel.axhline(1.0, color="#64748b", linestyle="--", linewidth=1.4)
@@ -287,37 +411,36 @@ def main() -> None:
         ax_rel.set_xlabel("Median lifespan / Full-cohort median lifespan")
         ax_rel.set_ylabel("Steepness (median/IQR) / Full-cohort steepness")
         ax_rel.grid(alpha=0.25, zorder=0)
-        fig_rel.tight_layout()
-        fig_rel.savefig(args.steepness_png_out)
-        plt.close(fig_rel)
+        fig.tight_layout()
+        _save_figure(fig, args.steepness_png_out)
 
-    print(f"Wrote KM plot: {args.png_out}")
+    if make_plots:
+        print(f"Wrote KM plot: {args.png_out}")
     print(f"Wrote cohort counts: {args.csv_out}")
-    print(f"Wrote age-timescale KM plot: {args.png_age_out}")
+    if make_plots:
+        print(f"Wrote age-timescale KM plot: {args.png_age_out}")
     print(f"Wrote age-timescale cohort counts: {args.csv_age_out}")
     print(f"Wrote age-timescale summary: {args.age_summary_csv_out}")
-    print(f"Wrote steepness/longevity scatter: {args.steepness_png_out}")
+    if make_plots:
+        print(f"Wrote steepness/longevity scatter: {args.steepness_png_out}")
 
     # Separate asthma-vs-full age-timescale KM.
     cohorts_asthma_age = [
-        ("full", "Full cohort (age>=20, eligstat=1)", pd.Series(True, index=df_age.index), COHORT_COLORS["full"]),
-        ("asthma", "Asthma (MCQ010=1)", df_age["asthma"] == True, COHORT_COLORS["asthma"]),  # noqa: E712
+        ("full", "Full cohort (age>=20, eligstat=1)", None, COHORT_COLORS["full"]),
+        ("asthma", "Asthma (MCQ010=1)", df_age["asthma"], COHORT_COLORS["asthma"]),
     ]
-    ensure_dir(Path(args.png_asthma_age_out).parent)
-    fig_a, ax_a = plt.subplots(figsize=(10, 7), dpi=150)
-    kmf_a = KaplanMeierFitter()
+    if make_plots:
+        ensure_dir(Path(args.png_asthma_age_out).parent)
+        ax_a = _fresh_axes(fig, 10, 7)
     asthma_rows = []
-    for _, label, mask, color in cohorts_asthma_age:
-        sub = df_age.loc[mask].copy()
+    for key, label, mask, color in cohorts_asthma_age:
+        sub = df_age if mask is None else df_age.loc[mask]
         if sub.empty:
             continue
-        kmf_a.fit(
-            durations=sub["end_age"],
-            event_observed=sub["event"],
-            entry=sub["entry_age"],
-            label=label,
-        )
-        kmf_a.plot_survival_function(ax=ax_a, ci_show=True, color=color, linewidth=2.2)
+        if make_plots:
+            # The full-cohort curve is identical to the one already fitted for the disease plot.
+            kmf_a = age_fits.get(key) or _fit_km_by_age(sub, label)
+            _plot_km_curve(kmf_a, ax_a, color, linewidth=2.2)
         asthma_rows.append(
             {
                 "cohort": label,
@@ -329,19 +452,20 @@ def main() -> None:
                 "max_end_age_years": float(sub["end_age"].max()),
             }
         )
-    ax_a.set_title("NHANES Kaplan-Meier Survival by Age: Asthma vs Full Cohort")
-    ax_a.set_xlabel("Age (years)")
-    ax_a.set_ylabel("Survival probability")
-    ax_a.set_ylim(0, 1.0)
-    ax_a.grid(alpha=0.25)
-    ax_a.legend(loc="best", frameon=False)
-    fig_a.tight_layout()
-    fig_a.savefig(args.png_asthma_age_out)
-    plt.close(fig_a)
+    if make_plots:
+        ax_a.set_title("NHANES Kaplan-Meier Survival by Age: Asthma vs Full Cohort")
+        ax_a.set_xlabel("Age (years)")
+        ax_a.set_ylabel("Survival probability")
+        ax_a.set_ylim(0, 1.0)
+        ax_a.grid(alpha=0.25)
+        ax_a.legend(loc="best", frameon=False)
+        fig.tight_layout()
+        _save_figure(fig, args.png_asthma_age_out)
 
     ensure_dir(Path(args.csv_asthma_age_out).parent)
     pd.DataFrame(asthma_rows).to_csv(args.csv_asthma_age_out, index=False)
-    print(f"Wrote asthma age-timescale KM plot: {args.png_asthma_age_out}")
+    if make_plots:
+        print(f"Wrote asthma age-timescale KM plot: {args.png_asthma_age_out}")
     print(f"Wrote asthma age-timescale cohort counts: {args.csv_asthma_age_out}")
 
 
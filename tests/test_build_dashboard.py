@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str((Path(__file__).resolve().parents[1] / "src")))
+
+from build_dashboard import build_outputs, compact_points, compute_binned_long, trend_from_points
+
+
+class TestBuildDashboard(unittest.TestCase):
+    def setUp(self):
+        # Two bin means differ only past the 6th significant figure, so rounding would tie them.
+        mids = [22.5, 27.5, 32.5, 37.5, 42.5, 47.5]
+        means = [1.7000000, 1.7457613, 1.7457577, 1.7600000, 1.7700000, 1.7800000]
+        offsets = np.linspace(-0.01, 0.01, 40)
+        rows = [
+            {"biomarker_id": "A::X", "age_years": m, "value": mu + d, "sex": "female"}
+            for m, mu in zip(mids, means)
+            for d in offsets
+        ]
+        self.long_df = pd.DataFrame(rows)
+        self.cv_df = pd.DataFrame({"biomarker_id": ["A::X"], "biomarker_name": ["X"], "age_bin": ["20-24"]})
+
+    def test_trends_use_full_precision_points(self):
+        binned = compute_binned_long(self.long_df[["biomarker_id", "age_years", "value"]], group_cols=["biomarker_id"])
+        binned = binned.sort_values("age_mid")
+        points = [
+            {"age_mid": float(r.age_mid), "mean": float(r.mean), "passes_n_threshold": bool(r.passes_n_threshold)}
+            for r in binned.itertuples(index=False)
+        ]
+        expected = trend_from_points(points, "mean")
+        self.assertNotEqual(trend_from_points(compact_points(points), "mean")["spearman_rho"], expected["spearman_rho"])
+
+        _, metrics, _, payloads = build_outputs(
+            cv_df=self.cv_df,
+            metrics_df=pd.DataFrame(),
+            catalog_df=None,
+            long_df=self.long_df,
+            raw_sample_n=10,
+            random_seed=0,
+        )
+        got = metrics[0]["mean_trends"]["all"]
+        self.assertAlmostEqual(got["spearman_rho"], expected["spearman_rho"], places=12)
+        self.assertAlmostEqual(got["spearman_p"], expected["spearman_p"], places=12)
+        self.assertAlmostEqual(got["linear_slope_per_year"], expected["linear_slope_per_year"], places=12)
+
+        payload_means = [p["mean"] for p in next(iter(payloads.values()))["points"]]
+        self.assertEqual(payload_means[1], payload_means[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
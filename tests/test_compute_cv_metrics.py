@@ -7,19 +7,33 @@ from pathlib import Path
 
 import numpy as np
 import pandas as pd
+from scipy.stats import spearmanr
 
 sys.path.insert(0, str((Path(__file__).resolve().parents[1] / "src")))
 
-from compute_cv_metrics import assign_age_bins, compute_binned, compute_trends
+from compute_cv_metrics import assign_age_bins, compute_binned, compute_trends, grouped_slope, grouped_spearman
 
 
 class TestComputeCVMetrics(unittest.TestCase):
+    def assertCloseOrBothNan(self, got, expected):
+        if np.isnan(expected):
+            self.assertTrue(np.isnan(got))
+        else:
+            self.assertTrue(math.isclose(got, expected, rel_tol=1e-9))
+
     def test_assign_age_bins(self):
         s = pd.Series([20, 24, 25, 84, 85, 99])
         b, m = assign_age_bins(s)
         self.assertEqual(list(b.astype(str)), ["20-24", "20-24", "25-29", "80-84", "85+", "85+"])
         self.assertEqual(list(m.values), [22.5, 22.5, 27.5, 82.5, 87.5, 87.5])
 
+    def test_assign_age_bins_out_of_range(self):
+        s = pd.Series([19.9, np.nan, 200, 45])
+        b, m = assign_age_bins(s)
+        self.assertEqual(list(b.isna()), [True, True, True, False])
+        self.assertEqual(list(m.isna()), [True, True, True, False])
+        self.assertEqual(str(b.iloc[3]), "45-49")
+
     def test_cv_formula_and_threshold(self):
         df = pd.DataFrame(
             {
@@ -60,6 +74,38 @@ class TestComputeCVMetrics(unittest.TestCase):
         self.assertLess(t["linear_slope_cv_per_year"], 0)
         self.assertTrue(bool(t["decline_flag"]))
 
+    def test_grouped_spearman_matches_scipy(self):
+        df = pd.DataFrame(
+            {
+                "g": ["A"] * 7 + ["B"] * 5 + ["C"] * 6,
+                "x": [22.5, 27.5, 32.5, 37.5, 42.5, 47.5, 52.5, 22.5, 27.5, 32.5, 37.5, 42.5]
+                + [22.5, 27.5, 32.5, 37.5, 42.5, 47.5],
+                "y": [0.3, 0.1, 0.1, 0.4, 0.2, 0.5, 0.2, 1.0, 2.0, 2.0, 3.0, 5.0] + [0.6, 0.5, np.nan, 0.3, 0.2, 0.1],
+            }
+        )
+        out = grouped_spearman(df, ["g"], "x", "y").set_index("g")
+        for key, g in df.groupby("g"):
+            rho, p = spearmanr(g["x"], g["y"])
+            self.assertCloseOrBothNan(out.loc[key, "spearman_rho"], rho)
+            self.assertCloseOrBothNan(out.loc[key, "spearman_p"], p)
+        self.assertTrue(np.isnan(out.loc["C", "spearman_rho"]))
+        self.assertEqual(out.loc["C", "n_bins"], 6)
+
+    def test_grouped_slope_matches_polyfit(self):
+        df = pd.DataFrame(
+            {
+                "g": ["A"] * 4 + ["B"] + ["C"] * 4,
+                "x": [22.5, 27.5, 32.5, 37.5, 22.5, 22.5, 27.5, 32.5, 37.5],
+                "y": [0.30, 0.21, 0.25, 0.12, 0.40, 0.30, np.nan, 0.25, 0.12],
+            }
+        )
+        out = grouped_slope(df, ["g"], "x", "y")
+        expected = np.polyfit(df["x"].iloc[:4], df["y"].iloc[:4], 1)[0]
+        self.assertTrue(math.isclose(out.loc["A"], expected, rel_tol=1e-9))
+        self.assertTrue(np.isnan(out.loc["B"]))
+        self.assertTrue(np.isnan(np.polyfit(df["x"].iloc[5:], df["y"].iloc[5:], 1)[0]))
+        self.assertTrue(np.isnan(out.loc["C"]))
+
 
 if __name__ == "__main__":
     unittest.main()